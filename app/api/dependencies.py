@@ -0,0 +1,30 @@
+from fastapi import Request
+from app.config import Settings, get_settings
+from app.core.rag_pipeline import RAGPipeline
+from app.services.pdf_processor import PDFProcessor
+from app.services.vector_store import VectorStore
+
+
+async def get_app_settings() -> Settings:
+    """
+    Get the cached application settings.
+    
+    The dependencies here only read state built at startup, so they are
+    async; FastAPI runs sync dependencies in its threadpool.
+    """
+    return get_settings()
+
+
+async def get_pipeline(request: Request) -> RAGPipeline:
+    """Get the shared RAG pipeline created at application startup."""
+    return request.app.state.pipeline
+
+
+async def get_vector_store(request: Request) -> VectorStore:
+    """Get the vector store owned by the shared RAG pipeline."""
+    return request.app.state.pipeline.vector_store
+
+
+async def get_pdf_processor(request: Request) -> PDFProcessor:
+    """Get the shared PDF processor created at application startup."""
+    return request.app.state.pdf_processor
@@ -61,6 +61,16 @@ class UploadResponse(BaseModel):
     filename: str
     chunks_created: int
     total_documents: int
+    job_id: Optional[str] = None
+
+
+class IndexingJobResponse(BaseModel):
+    """Response model for a background indexing job."""
+    job_id: str
+    filename: str
+    status: str = Field(..., description="One of 'queued', 'running', 'completed' or 'failed'")
+    chunks_created: int = 0
+    error: Optional[str] = None
 
 
 class DocumentInfo(BaseModel):
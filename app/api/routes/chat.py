@@ -1,22 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from app.api.models.schemas import ChatRequest, ChatResponse, Source
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.api.dependencies import get_pipeline
+from app.api.models.schemas import ChatRequest, ChatResponse
 from app.core.rag_pipeline import RAGPipeline
 from app.utils.logger import app_logger as logger
 
 router = APIRouter()
 
-# Initialize RAG pipeline
-pipeline = RAGPipeline()
-
 
 @router.post("/query", response_model=ChatResponse)
-async def chat_query(request: ChatRequest):
+async def chat_query(request: ChatRequest, pipeline: RAGPipeline = Depends(get_pipeline)):
     """
     Process a user query and return an answer with sources.
     """
     try:
-        logger.info(f"Received chat query: {request.query[:100]}...")
+        logger.info("Received chat query: {:.100}...", request.query)
         
         # Process query through RAG pipeline
         response = await pipeline.query(
@@ -25,39 +23,43 @@ async def chat_query(request: ChatRequest):
             num_results=request.num_results
         )
         
-        # Convert sources to Pydantic models
-        sources = [Source(**source) for source in response.sources]
+        # Report whether the web search, if any, was served from its cache
+        headers = None
+        if response.search_cache_hit is not None:
+            headers = {'X-Cache': 'HIT' if response.search_cache_hit else 'MISS'}
         
-        return ChatResponse(
-            answer=response.answer,
-            sources=sources,
-            confidence=response.confidence,
-            used_web_search=response.used_web_search
-        )
+        # RAGSource dataclasses mirror the Source schema and orjson serializes
+        # them natively, so no Pydantic models are built per request
+        return ORJSONResponse(content={
+            'answer': response.answer,
+            'sources': response.sources,
+            'confidence': response.confidence,
+            'used_web_search': response.used_web_search
+        }, headers=headers)
         
     except Exception as e:
-        logger.error(f"Error processing chat query: {str(e)}")
+        logger.error("Error processing chat query: {}", e)
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
 @router.post("/stream")
-async def chat_query_stream(request: ChatRequest):
+async def chat_query_stream(request: ChatRequest, pipeline: RAGPipeline = Depends(get_pipeline)):
     """
     Process a user query and return a streaming response.
     """
-    try:
-        logger.info(f"Received streaming chat query: {request.query[:100]}...")
-        
-        async def generate():
+    logger.info("Received streaming chat query: {:.100}...", request.query)
+    
+    async def generate():
+        # The response has already started once this runs, so failures can
+        # only be logged and end the stream, not turned into an HTTP error
+        try:
             async for chunk in pipeline.query_stream(
                 user_query=request.query,
                 use_search=request.use_search,
                 num_results=request.num_results
             ):
                 yield chunk
-        
-        return StreamingResponse(generate(), media_type="text/plain")
-        
-    except Exception as e:
-        logger.error(f"Error processing streaming query: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+        except Exception as e:
+            logger.error("Error processing streaming query: {}", e)
+    
+    return StreamingResponse(generate(), media_type="text/plain")
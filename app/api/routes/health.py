@@ -1,30 +1,27 @@
-from fastapi import APIRouter
+import asyncio
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
+from app.api.dependencies import get_pipeline
 from app.api.models.schemas import HealthResponse, DetailedHealthResponse
 from app.core.rag_pipeline import RAGPipeline
 from app.utils.logger import app_logger as logger
 
 router = APIRouter()
 
-# Initialize pipeline for health checks
-try:
-    pipeline = RAGPipeline()
-except Exception as e:
-    logger.error(f"Failed to initialize pipeline in health routes: {str(e)}")
-    pipeline = None
-
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Basic health check endpoint."""
-    return HealthResponse(
+    health = HealthResponse.model_construct(
         status="healthy",
         timestamp=datetime.utcnow().isoformat()
     )
+    return ORJSONResponse(content=health.model_dump())
 
 
 @router.get("/health/detailed", response_model=DetailedHealthResponse)
-async def detailed_health_check():
+async def detailed_health_check(pipeline: RAGPipeline = Depends(get_pipeline)):
     """Detailed health check with component status."""
     
     llm_status = "unknown"
@@ -34,29 +31,28 @@ async def detailed_health_check():
     embedding_model = "unknown"
     llm_model = "unknown"
     
-    if pipeline:
-        try:
-            # Check vector DB
-            stats = pipeline.vector_store.get_stats()
-            vector_db_status = "ok"
-            documents_indexed = stats.get('total_chunks', 0)
-            embedding_model = stats.get('embedding_model', 'unknown')
-            
-            # LLM status
-            llm_status = "ok"
-            llm_model = pipeline.llm_client.model
-            
-            # Search status
-            search_status = "ok"
-            
-        except Exception as e:
-            logger.error(f"Error in detailed health check: {str(e)}")
+    try:
+        # Check vector DB; Chroma calls block, so run them off the event loop
+        stats = await asyncio.to_thread(pipeline.vector_store.get_stats)
+        vector_db_status = "ok"
+        documents_indexed = stats.get('total_chunks', 0)
+        embedding_model = stats.get('embedding_model', 'unknown')
+        
+        # LLM status
+        llm_status = "ok"
+        llm_model = pipeline.llm_client.model
+        
+        # Search status
+        search_status = "ok"
+        
+    except Exception as e:
+        logger.error("Error in detailed health check: {}", e)
     
     overall_status = "healthy" if all(
         s == "ok" for s in [llm_status, vector_db_status, search_status]
     ) else "degraded"
     
-    return DetailedHealthResponse(
+    health = DetailedHealthResponse.model_construct(
         status=overall_status,
         timestamp=datetime.utcnow().isoformat(),
         llm_status=llm_status,
@@ -66,3 +62,4 @@ async def detailed_health_check():
         embedding_model=embedding_model,
         llm_model=llm_model
     )
+    return ORJSONResponse(content=health.model_dump())
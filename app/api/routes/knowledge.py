@@ -1,30 +1,151 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+import asyncio
+import os
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from pathlib import Path
-from typing import List
-from app.api.models.schemas import UploadResponse, DocumentListResponse
+from collections import OrderedDict
+import uuid
+import aiofiles
+from typing import Dict, List, Optional, Tuple
+from app.api.dependencies import get_app_settings, get_pdf_processor, get_vector_store
+from app.api.models.schemas import UploadResponse, DocumentListResponse, IndexingJobResponse
 from app.services.pdf_processor import PDFProcessor
 from app.services.vector_store import VectorStore
-from app.config import settings
+from app.config import Settings
 from app.utils.logger import app_logger as logger
 
 router = APIRouter()
 
-# Initialize services
-pdf_processor = PDFProcessor()
-vector_store = VectorStore()
+# Size of the chunks uploaded files are streamed to disk in
+UPLOAD_CHUNK_SIZE = 1 << 20
 
+# Status of background indexing jobs, kept in memory for this process only
+MAX_TRACKED_JOBS = 1000
+indexing_jobs: "OrderedDict[str, Dict]" = OrderedDict()
 
-@router.post("/upload", response_model=UploadResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+# Last PDF directory listing as (directory, mtime_ns, sorted names)
+_dir_cache: Optional[Tuple[str, int, List[str]]] = None
+
+# Listings of directories modified this recently aren't cached: a file created
+# within the same mtime tick wouldn't change the mtime the cache is keyed on
+DIR_CACHE_MIN_AGE_NS = 1_000_000_000
+
+
+def list_pdf_names(pdf_dir: Path) -> List[str]:
+    """
+    List the PDF filenames in a directory, reusing the last listing while
+    the directory's mtime is unchanged.
+    
+    Args:
+        pdf_dir: Directory holding the uploaded PDFs
+        
+    Returns:
+        Sorted list of PDF filenames
+    """
+    global _dir_cache
+    
+    try:
+        mtime_ns = os.stat(pdf_dir).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    
+    key = str(pdf_dir)
+    if _dir_cache is not None and _dir_cache[0] == key and _dir_cache[1] == mtime_ns:
+        return _dir_cache[2]
+    
+    with os.scandir(pdf_dir) as entries:
+        names = sorted(entry.name for entry in entries if entry.name.endswith(".pdf"))
+    
+    if time.time_ns() - mtime_ns > DIR_CACHE_MIN_AGE_NS:
+        _dir_cache = (key, mtime_ns, names)
+    return names
+
+
+def create_indexing_job(filename: str) -> str:
+    """
+    Register a queued indexing job and return its id.
+    
+    Args:
+        filename: Name of the uploaded file
+        
+    Returns:
+        The new job id
+    """
+    job_id = uuid.uuid4().hex
+    indexing_jobs[job_id] = {
+        'job_id': job_id,
+        'filename': filename,
+        'status': 'queued',
+        'chunks_created': 0,
+        'error': None
+    }
+    
+    # Forget the oldest jobs so the registry stays bounded
+    while len(indexing_jobs) > MAX_TRACKED_JOBS:
+        indexing_jobs.popitem(last=False)
+    
+    return job_id
+
+
+def index_pdf(
+    file_path: str,
+    job_id: str,
+    pdf_processor: PDFProcessor,
+    vector_store: VectorStore
+) -> None:
+    """
+    Process and index a saved PDF, recording the outcome on its job.
+    
+    Runs as a background task; FastAPI executes sync tasks in its threadpool,
+    so parsing and embedding never block the event loop.
+    
+    Args:
+        file_path: Path to the saved PDF file
+        job_id: Id of the indexing job tracking this file
+        pdf_processor: Processor used to parse and chunk the PDF
+        vector_store: Vector store the chunks are indexed into
+    """
+    job = indexing_jobs.get(job_id, {})
+    job['status'] = 'running'
+    filename = Path(file_path).name
+    
+    try:
+        chunks = pdf_processor.process_pdf(file_path)
+        
+        # Replace chunks from a previous upload of the same file only once the
+        # new one has parsed, so a broken upload doesn't wipe the old chunks
+        vector_store.delete_by_filename(filename)
+        vector_store.add_documents(chunks)
+        
+        job['chunks_created'] = len(chunks)
+        job['status'] = 'completed'
+        logger.info("Indexed {} chunks from {}", len(chunks), filename)
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        logger.error("Error indexing PDF {}: {}", file_path, e)
+
+
+@router.post("/upload", response_model=UploadResponse, status_code=202)
+async def upload_pdf(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    settings: Settings = Depends(get_app_settings),
+    pdf_processor: PDFProcessor = Depends(get_pdf_processor),
+    vector_store: VectorStore = Depends(get_vector_store)
+):
     """
     Upload a PDF document to the knowledge base.
+    
+    The file is saved immediately and indexed in the background.
     """
     try:
         # Validate file type
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
-        logger.info(f"Uploading PDF: {file.filename}")
+        logger.info("Uploading PDF: {}", file.filename)
         
         # Save file
         pdf_dir = Path(settings.pdf_directory)
@@ -32,62 +153,88 @@ async def upload_pdf(file: UploadFile = File(...)):
         
         file_path = pdf_dir / file.filename
         
-        # Write uploaded file
-        with open(file_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
+        # Stream uploaded file to disk without buffering it in memory. Write
+        # to a temporary file and swap it in, so a job still parsing (and
+        # memory-mapping) an earlier upload keeps reading the old file
+        # instead of one truncated underneath it
+        tmp_path = pdf_dir / f".{file.filename}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        logger.info(f"Saved PDF to: {file_path}")
+        logger.info("Saved PDF to: {}", file_path)
         
-        # Process and index the PDF
-        chunks = pdf_processor.process_pdf(str(file_path))
-        vector_store.add_documents(chunks)
-        
-        # Get updated stats
-        stats = vector_store.get_stats()
+        # Process and index the PDF after the response is sent
+        job_id = create_indexing_job(file.filename)
+        background_tasks.add_task(index_pdf, str(file_path), job_id, pdf_processor, vector_store)
         
-        return UploadResponse(
-            message=f"Successfully uploaded and indexed {file.filename}",
+        upload_response = UploadResponse.model_construct(
+            message=f"Uploaded {file.filename}, indexing in background. Check /jobs/{job_id} for status",
             filename=file.filename,
-            chunks_created=len(chunks),
-            total_documents=stats['total_chunks']
+            chunks_created=0,
+            total_documents=await asyncio.to_thread(vector_store.count),
+            job_id=job_id
         )
+        return ORJSONResponse(content=upload_response.model_dump(), status_code=202)
         
     except Exception as e:
-        logger.error(f"Error uploading PDF: {str(e)}")
+        logger.error("Error uploading PDF: {}", e)
         raise HTTPException(status_code=500, detail=f"Error uploading PDF: {str(e)}")
 
 
+@router.get("/jobs/{job_id}", response_model=IndexingJobResponse)
+async def get_indexing_job(job_id: str):
+    """
+    Get the status of a background indexing job.
+    """
+    job = indexing_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown indexing job: {job_id}")
+    
+    return ORJSONResponse(content=IndexingJobResponse.model_construct(**job).model_dump())
+
+
 @router.get("/documents", response_model=DocumentListResponse)
-async def list_documents():
+async def list_documents(settings: Settings = Depends(get_app_settings)):
     """
     List all documents in the knowledge base.
     """
     try:
         pdf_dir = Path(settings.pdf_directory)
         
-        if not pdf_dir.exists():
-            return DocumentListResponse(documents=[], total_count=0)
-        
-        pdf_files = [f.name for f in pdf_dir.glob("*.pdf")]
+        # Directory scans hit the filesystem, so keep them off the event loop
+        pdf_files = await asyncio.to_thread(list_pdf_names, pdf_dir)
         
-        return DocumentListResponse(
-            documents=sorted(pdf_files),
+        document_list = DocumentListResponse.model_construct(
+            documents=pdf_files,
             total_count=len(pdf_files)
         )
+        return ORJSONResponse(content=document_list.model_dump())
         
     except Exception as e:
-        logger.error(f"Error listing documents: {str(e)}")
+        logger.error("Error listing documents: {}", e)
         raise HTTPException(status_code=500, detail=f"Error listing documents: {str(e)}")
 
 
 @router.delete("/documents/{filename}")
-async def delete_document(filename: str):
+def delete_document(
+    filename: str,
+    settings: Settings = Depends(get_app_settings),
+    vector_store: VectorStore = Depends(get_vector_store)
+):
     """
     Delete a document from the knowledge base.
+    
+    Defined with def so FastAPI runs the blocking Chroma and file work in
+    its threadpool.
     """
     try:
-        logger.info(f"Deleting document: {filename}")
+        logger.info("Deleting document: {}", filename)
         
         # Delete from vector store
         vector_store.delete_by_filename(filename)
@@ -96,19 +243,24 @@ async def delete_document(filename: str):
         pdf_path = Path(settings.pdf_directory) / filename
         if pdf_path.exists():
             pdf_path.unlink()
-            logger.info(f"Deleted file: {pdf_path}")
+            logger.info("Deleted file: {}", pdf_path)
         
-        return {"message": f"Successfully deleted {filename}"}
+        return ORJSONResponse(content={"message": f"Successfully deleted {filename}"})
         
     except Exception as e:
-        logger.error(f"Error deleting document: {str(e)}")
+        logger.error("Error deleting document: {}", e)
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
 
 @router.post("/reindex")
-async def reindex_all():
+def reindex_all(
+    pdf_processor: PDFProcessor = Depends(get_pdf_processor),
+    vector_store: VectorStore = Depends(get_vector_store)
+):
     """
     Reindex all PDF documents in the knowledge base.
+    
+    Defined with def so FastAPI runs parsing and embedding in its threadpool.
     """
     try:
         logger.info("Starting reindexing of all documents")
@@ -116,21 +268,23 @@ async def reindex_all():
         # Clear existing collection
         vector_store.clear_collection()
         
-        # Process all PDFs
-        chunks = pdf_processor.process_directory()
+        # Process all PDFs; the fresh manifest records every file
+        manifest = {}
+        chunks = pdf_processor.process_directory(manifest=manifest)
         
         # Index all chunks
         if chunks:
             vector_store.add_documents(chunks)
+        pdf_processor.save_manifest(manifest)
         
         stats = vector_store.get_stats()
         
-        return {
+        return ORJSONResponse(content={
             "message": "Reindexing completed successfully",
             "total_chunks": stats['total_chunks'],
             "unique_files": stats['unique_files']
-        }
+        })
         
     except Exception as e:
-        logger.error(f"Error during reindexing: {str(e)}")
+        logger.error("Error during reindexing: {}", e)
         raise HTTPException(status_code=500, detail=f"Error during reindexing: {str(e)}")
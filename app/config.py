@@ -1,10 +1,13 @@
-from pydantic_settings import BaseSettings
-from typing import Optional
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     """Application configuration settings loaded from environment variables."""
     
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
+    
     # LLM Configuration
     llm_provider: str = "openai"
     openai_api_key: str
@@ -17,11 +20,18 @@ class Settings(BaseSettings):
     vector_db_path: str = "./data/vector_db"
     collection_name: str = "product_knowledge"
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_backend: str = "torch"  # torch, onnx or onnx-int8
+    embedding_onnx_path: str = "./data/onnx"
+    index_batch_size: int = 256  # chunks embedded and added per batch
+    embedding_cache_path: str = "./data/cache/embeddings.sqlite3"  # empty disables
     
     # Web Search Configuration
     search_api_provider: str = "tavily"
     tavily_api_key: str
     max_search_results: int = 5
+    search_cache_ttl: int = 600  # seconds
+    search_cache_maxsize: int = 1024
+    search_confidence_margin: float = 0.0  # min top-1/top-2 confidence gap; 0 disables
     
     # PDF Processing
     pdf_directory: str = "./data/pdfs"
@@ -34,6 +44,7 @@ class Settings(BaseSettings):
     api_title: str = "RAG Chatbot API"
     api_version: str = "1.0.0"
     allowed_origins: str = "*"
+    thread_pool_size: int = 0  # 0 = max(8, 4 x CPU count)
     
     # Application
     log_level: str = "INFO"
@@ -42,10 +53,15 @@ class Settings(BaseSettings):
     # Optional API Key for endpoint security
     api_key: Optional[str] = None
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    @property
+    def allowed_origins_list(self) -> List[str]:
+        """CORS origins parsed from the comma-separated setting."""
+        if self.allowed_origins == "*":
+            return ["*"]
+        return [origin.strip() for origin in self.allowed_origins.split(",")]
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the application settings, parsing the environment only once."""
+    return Settings()
@@ -0,0 +1,98 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from app.utils.logger import app_logger as logger
+
+
+class EmbeddingCache:
+    """Persistent embedding cache in SQLite, keyed by SHA-256 of the text and the model.
+    
+    Vectors are stored as float16, halving the cache size; rows written as
+    float32 by earlier versions are still read.
+    """
+    
+    def __init__(self, db_path: str, model_key: str):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            db_path: Path to the SQLite file
+            model_key: Identifies the model producing the vectors, so cached
+                vectors from another model are never returned
+        """
+        self.model_key = model_key
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # One connection shared by the API threadpool, serialized by a lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "hash BLOB NOT NULL, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL, "
+                "PRIMARY KEY (hash, model))"
+            )
+        logger.info("Embedding cache opened at: {}", db_path)
+    
+    @staticmethod
+    def hash_text(text: str) -> bytes:
+        """SHA-256 digest of the text."""
+        return hashlib.sha256(text.encode('utf-8')).digest()
+    
+    def get_many(self, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up cached vectors.
+        
+        Args:
+            hashes: Text digests from hash_text
+        
+        Returns:
+            Mapping of digest to vector for the hashes that were cached
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, dim, vec FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [self.model_key, *batch]
+                ).fetchall()
+                for digest, dim, vec in rows:
+                    dtype = np.float16 if len(vec) == dim * 2 else np.float32
+                    found[digest] = np.frombuffer(vec, dtype=dtype, count=dim).astype(np.float32)
+        
+        return found
+    
+    def put_many(self, hashes: List[bytes], vectors: np.ndarray) -> np.ndarray:
+        """
+        Store vectors for the given digests.
+        
+        Args:
+            hashes: Text digests from hash_text
+            vectors: 2-D array with one row per digest
+            
+        Returns:
+            The vectors as stored, widened back to float32, so callers use
+            the same values a later cache hit would return
+        """
+        vectors = np.asarray(vectors).astype(np.float16)
+        rows = [
+            (digest, self.model_key, vector.shape[0], vector.tobytes())
+            for digest, vector in zip(hashes, vectors)
+        ]
+        
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        
+        return vectors.astype(np.float32)
@@ -1,9 +1,18 @@
-from typing import List
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Union
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from app.config import settings
+from app.config import get_settings
+from app.core.embedding_cache import EmbeddingCache
 from app.utils.logger import app_logger as logger
 
 
+# Number of single-text (query) embeddings kept in memory
+QUERY_CACHE_SIZE = 4096
+
+
 class EmbeddingService:
     """Service for generating text embeddings using sentence transformers."""
     
@@ -18,31 +27,88 @@ class EmbeddingService:
     
     def __init__(self):
         if self._model is None:
-            logger.info(f"Loading embedding model: {settings.embedding_model}")
-            self._model = SentenceTransformer(settings.embedding_model)
-            logger.info(f"Embedding model loaded successfully. Dimension: {self.get_dimension()}")
+            settings = get_settings()
+            self._model_name = settings.embedding_model
+            logger.info("Loading embedding model: {} (backend: {})", self._model_name, settings.embedding_backend)
+            self._model = self._load_model(settings.embedding_backend, settings.embedding_onnx_path)
+            self._query_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+            self._query_cache_lock = threading.Lock()
+            
+            # Chunk embeddings persisted across runs; the backend is part of
+            # the key because quantized backends produce different vectors
+            self._embedding_cache = (
+                EmbeddingCache(settings.embedding_cache_path, f"{self._model_name}:{settings.embedding_backend}")
+                if settings.embedding_cache_path else None
+            )
+            logger.info("Embedding model loaded successfully. Dimension: {}", self.get_dimension())
+    
+    def _load_model(self, backend: str, onnx_path: str):
+        """
+        Load the encoder for the configured backend.
+        
+        Args:
+            backend: 'torch', 'onnx' or 'onnx-int8'
+            onnx_path: Directory for exported ONNX models
+            
+        Returns:
+            An object providing encode() and get_sentence_embedding_dimension()
+        """
+        if backend in ("onnx", "onnx-int8"):
+            from app.core.onnx_embeddings import ONNXSentenceEncoder
+            return ONNXSentenceEncoder(self._model_name, onnx_path, quantize=backend == "onnx-int8")
+        
+        if backend != "torch":
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        
+        model = SentenceTransformer(self._model_name)
+        if model.device.type == "cuda":
+            # Half precision halves memory traffic on GPU
+            model.half()
+        return model
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def generate_embedding(self, text: str, as_list: bool = True) -> Union[List[float], np.ndarray]:
         """
         Generate embedding for a single text.
         
+        Embeddings are cached in an LRU keyed by a hash of the text, so
+        repeated queries skip the model forward pass.
+        
         Args:
             text: Input text to embed
+            as_list: Return a list of floats; otherwise a read-only ndarray
             
         Returns:
-            List of floats representing the embedding vector
+            The embedding vector
         """
         if not text or not text.strip():
             logger.warning("Empty text provided for embedding")
-            return [0.0] * self.get_dimension()
+            embedding = np.zeros(self.get_dimension(), dtype=np.float32)
+            return embedding.tolist() if as_list else embedding
+        
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
         
-        embedding = self._model.encode(text, convert_to_tensor=False)
-        return embedding.tolist()
+        if embedding is None:
+            embedding = self._model.encode(text, convert_to_tensor=False)
+            # Cached arrays are shared between callers
+            embedding.flags.writeable = False
+            with self._query_cache_lock:
+                self._query_cache[key] = embedding
+                if len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+        
+        return embedding.tolist() if as_list else embedding
     
     def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """
         Generate embeddings for multiple texts efficiently.
         
+        Texts already embedded by this model are read from the persistent
+        embedding cache; only the rest go through the model.
+        
         Args:
             texts: List of texts to embed
             batch_size: Number of texts to process at once
@@ -54,7 +120,29 @@ class EmbeddingService:
             logger.warning("Empty text list provided for batch embedding")
             return []
         
-        logger.info(f"Generating embeddings for {len(texts)} texts")
+        if self._embedding_cache is None:
+            return [emb.tolist() for emb in self._encode_batch(texts, batch_size)]
+        
+        hashes = [EmbeddingCache.hash_text(text) for text in texts]
+        vectors = self._embedding_cache.get_many(hashes)
+        
+        # Encode each uncached text once, even if it repeats in the batch
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in vectors:
+                missing.setdefault(digest, text)
+        logger.info("Embedding cache hits: {} of {} texts", len(texts) - len(missing), len(texts))
+        
+        if missing:
+            missing_hashes = list(missing)
+            embeddings = self._encode_batch(list(missing.values()), batch_size)
+            vectors.update(zip(missing_hashes, self._embedding_cache.put_many(missing_hashes, embeddings)))
+        
+        return [vectors[digest].tolist() for digest in hashes]
+    
+    def _encode_batch(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Run the model over a list of texts."""
+        logger.info("Generating embeddings for {} texts", len(texts))
         embeddings = self._model.encode(
             texts,
             batch_size=batch_size,
@@ -62,8 +150,19 @@ class EmbeddingService:
             convert_to_tensor=False
         )
         
-        logger.info(f"Successfully generated {len(embeddings)} embeddings")
-        return [emb.tolist() for emb in embeddings]
+        logger.info("Successfully generated {} embeddings", len(embeddings))
+        return embeddings
+    
+    def warmup(self) -> np.ndarray:
+        """
+        Run the model once so the first request doesn't pay for lazy setup.
+        
+        Bypasses the caches.
+        
+        Returns:
+            Embedding of a dummy text
+        """
+        return self._model.encode(["warmup"], convert_to_tensor=False)[0]
     
     def get_dimension(self) -> int:
         """Get the dimension of the embedding vectors."""
@@ -71,4 +170,4 @@ class EmbeddingService:
     
     def get_model_name(self) -> str:
         """Get the name of the loaded model."""
-        return settings.embedding_model
+        return self._model_name
@@ -1,23 +1,38 @@
 from typing import List, Dict, Optional
-from openai import OpenAI
-from app.config import settings
+from openai import AsyncOpenAI
+from app.services.vector_store import SearchResults
+from app.config import get_settings
 from app.utils.logger import app_logger as logger
 
+_SYSTEM_MESSAGE = """You are a helpful AI assistant for a product support chatbot. Your role is to answer user questions accurately using the provided context from product documentation and web search results.
+
+Guidelines:
+- Always prioritize information from the Internal Knowledge Base (product documentation)
+- Use web search results to supplement or provide additional context when needed
+- If the answer is not in the provided context, clearly state that you don't have that information
+- Be concise but comprehensive in your answers
+- If referencing specific sources, mention them
+- Maintain a professional and friendly tone"""
+
+_NO_KB_CONTEXT = "No relevant internal documentation found."
+_ANSWER_INSTRUCTION = "\nPlease provide a helpful answer based on the context above:"
+
 
 class LLMClient:
     """Client for interacting with OpenAI's language models."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        settings = get_settings()
+        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = settings.openai_model
         self.temperature = settings.openai_temperature
         self.max_tokens = settings.openai_max_tokens
-        logger.info(f"Initialized LLMClient with model: {self.model}")
+        logger.info("Initialized LLMClient with model: {}", self.model)
     
     def create_prompt(
         self,
         query: str,
-        knowledge_base_context: List[Dict],
+        knowledge_base_context: SearchResults,
         search_results_context: Optional[str] = None
     ) -> List[Dict[str, str]]:
         """
@@ -31,54 +46,35 @@ class LLMClient:
         Returns:
             List of message dictionaries for the API
         """
-        # Build context from knowledge base
-        kb_context_parts = []
+        # Build context from knowledge base: one header, content and blank
+        # line per source, joined once
         if knowledge_base_context:
-            kb_context_parts.append("Internal Knowledge Base:\n")
-            for i, doc in enumerate(knowledge_base_context, 1):
-                source = doc.get('metadata', {}).get('filename', 'Unknown')
-                page = doc.get('metadata', {}).get('page_number', 'N/A')
-                kb_context_parts.append(f"[Source {i}: {source}, Page {page}]")
-                kb_context_parts.append(doc.get('content', ''))
-                kb_context_parts.append("")  # blank line
-        
-        kb_context = "\n".join(kb_context_parts) if kb_context_parts else "No relevant internal documentation found."
-        
-        # System message
-        system_message = """You are a helpful AI assistant for a product support chatbot. Your role is to answer user questions accurately using the provided context from product documentation and web search results.
-
-Guidelines:
-- Always prioritize information from the Internal Knowledge Base (product documentation)
-- Use web search results to supplement or provide additional context when needed
-- If the answer is not in the provided context, clearly state that you don't have that information
-- Be concise but comprehensive in your answers
-- If referencing specific sources, mention them
-- Maintain a professional and friendly tone"""
+            kb_context = "Internal Knowledge Base:\n\n" + "\n".join(
+                f"[Source {i}: {metadata.get('filename', 'Unknown')}, Page {metadata.get('page_number', 'N/A')}]\n{content}\n"
+                for i, (content, metadata) in enumerate(
+                    zip(knowledge_base_context.contents, knowledge_base_context.metadatas), 1
+                )
+            )
+        else:
+            kb_context = _NO_KB_CONTEXT
         
         # User message with context
-        user_content_parts = [
-            kb_context,
-            ""
-        ]
-        
         if search_results_context:
-            user_content_parts.append(search_results_context)
-            user_content_parts.append("")
-        
-        user_content_parts.append(f"User Question: {query}")
-        user_content_parts.append("\nPlease provide a helpful answer based on the context above:")
+            user_content = f"{kb_context}\n\n{search_results_context}\n\nUser Question: {query}\n{_ANSWER_INSTRUCTION}"
+        else:
+            user_content = f"{kb_context}\n\nUser Question: {query}\n{_ANSWER_INSTRUCTION}"
         
         messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": "\n".join(user_content_parts)}
+            {"role": "system", "content": _SYSTEM_MESSAGE},
+            {"role": "user", "content": user_content}
         ]
         
         return messages
     
-    def generate_response(
+    async def generate_response(
         self,
         query: str,
-        knowledge_base_context: List[Dict],
+        knowledge_base_context: SearchResults,
         search_results_context: Optional[str] = None
     ) -> str:
         """
@@ -95,9 +91,9 @@ Guidelines:
         try:
             messages = self.create_prompt(query, knowledge_base_context, search_results_context)
             
-            logger.info(f"Generating response for query: '{query[:100]}...'")
+            logger.info("Generating response for query: '{:.100}...'", query)
             
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
@@ -108,18 +104,18 @@ Guidelines:
             
             # Log token usage
             usage = response.usage
-            logger.info(f"Response generated. Tokens used - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+            logger.info("Response generated. Tokens used - Prompt: {}, Completion: {}, Total: {}", usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
             
             return answer
             
         except Exception as e:
-            logger.error(f"Error generating LLM response: {str(e)}")
+            logger.error("Error generating LLM response: {}", e)
             raise
     
     async def generate_response_stream(
         self,
         query: str,
-        knowledge_base_context: List[Dict],
+        knowledge_base_context: SearchResults,
         search_results_context: Optional[str] = None
     ):
         """
@@ -136,9 +132,9 @@ Guidelines:
         try:
             messages = self.create_prompt(query, knowledge_base_context, search_results_context)
             
-            logger.info(f"Generating streaming response for query: '{query[:100]}...'")
+            logger.info("Generating streaming response for query: '{:.100}...'", query)
             
-            stream = self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
@@ -146,10 +142,10 @@ Guidelines:
                 stream=True
             )
             
-            for chunk in stream:
+            async for chunk in stream:
                 if chunk.choices[0].delta.content is not None:
                     yield chunk.choices[0].delta.content
                     
         except Exception as e:
-            logger.error(f"Error in streaming LLM response: {str(e)}")
+            logger.error("Error in streaming LLM response: {}", e)
             raise
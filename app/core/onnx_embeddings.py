@@ -0,0 +1,104 @@
+import os
+from pathlib import Path
+from typing import List, Union
+import numpy as np
+from app.utils.logger import app_logger as logger
+
+
+class ONNXSentenceEncoder:
+    """
+    Sentence encoder running a transformer exported to ONNX Runtime.
+    
+    Drop-in for the parts of SentenceTransformer used by EmbeddingService.
+    Assumes a mean-pooled, L2-normalized model such as all-MiniLM-L6-v2.
+    """
+    
+    def __init__(self, model_name: str, export_dir: str, quantize: bool = False, max_length: int = 256):
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX embedding backend requires optimum with onnxruntime: "
+                "pip install 'optimum[onnxruntime]'"
+            ) from e
+        
+        hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        model_dir = Path(export_dir) / hub_name.replace("/", "__")
+        
+        # Export once, then reuse the ONNX graph on later startups
+        if not (model_dir / "model.onnx").exists():
+            logger.info("Exporting {} to ONNX at {}", hub_name, model_dir)
+            model = ORTModelForFeatureExtraction.from_pretrained(hub_name, export=True)
+            model.save_pretrained(model_dir)
+            AutoTokenizer.from_pretrained(hub_name).save_pretrained(model_dir)
+        
+        file_name = "model.onnx"
+        if quantize:
+            file_name = "model_quantized.onnx"
+            if not (model_dir / file_name).exists():
+                logger.info("Quantizing {} to INT8", hub_name)
+                quantizer = ORTQuantizer.from_pretrained(model_dir, file_name="model.onnx")
+                quantization_config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=model_dir, quantization_config=quantization_config)
+        
+        session_options = onnxruntime.SessionOptions()
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session_options.intra_op_num_threads = os.cpu_count() or 1
+        
+        self._model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name=file_name,
+            session_options=session_options
+        )
+        self._tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self._max_length = max_length
+        self._dimension = self._model.config.hidden_size
+    
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_tensor: bool = False
+    ) -> np.ndarray:
+        """
+        Embed one text or a list of texts.
+        
+        Args:
+            sentences: Text or list of texts to embed
+            batch_size: Number of texts per ONNX Runtime call
+            show_progress_bar: Accepted for SentenceTransformer compatibility
+            convert_to_tensor: Accepted for SentenceTransformer compatibility
+            
+        Returns:
+            A 1-D embedding for a single text, otherwise a 2-D array
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else sentences
+        
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self._tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self._max_length,
+                return_tensors="np"
+            )
+            token_embeddings = self._model(**encoded).last_hidden_state
+            
+            # Mean pooling over non-padding tokens, then L2 normalization
+            mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        
+        embeddings = np.vstack(batches) if batches else np.empty((0, self._dimension), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        """Get the dimension of the embedding vectors."""
+        return self._dimension
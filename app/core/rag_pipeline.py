@@ -1,18 +1,34 @@
-from typing import List, Dict, Optional
+import asyncio
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from app.core.llm_client import LLMClient
-from app.services.vector_store import VectorStore
+import numpy as np
+from app.services.vector_store import SearchResults, VectorStore
 from app.services.web_search import WebSearchService
 from app.utils.logger import app_logger as logger
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class RAGSource:
+    """A source used to answer a query; fields mirror the API's Source schema."""
+    type: str
+    filename: Optional[str] = None
+    page_number: Optional[str] = None
+    chunk_number: Optional[str] = None
+    title: Optional[str] = None
+    url: Optional[str] = None
+    relevance_score: float = 0.0
+
+
+@dataclass(slots=True, frozen=True)
 class RAGResponse:
     """Response from the RAG pipeline."""
     answer: str
-    sources: List[Dict]
+    sources: Tuple[RAGSource, ...]
     confidence: float
     used_web_search: bool
+    # None when no web search was attempted
+    search_cache_hit: Optional[bool] = None
 
 
 class RAGPipeline:
@@ -44,19 +60,21 @@ class RAGPipeline:
         Returns:
             RAGResponse object with answer and metadata
         """
-        logger.info(f"Processing query: '{user_query[:100]}...'")
+        logger.info("Processing query: '{:.100}...'", user_query)
         
-        # Step 1: Retrieve from knowledge base
-        kb_results = self.vector_store.search(user_query, k=num_results)
+        # Step 1: Retrieve from knowledge base (embedding + ANN query are blocking)
+        kb_results = await asyncio.to_thread(self.vector_store.search, user_query, num_results)
         
         # Step 2: Determine if web search is needed
         used_search = False
         search_context = None
         search_sources = []
+        search_cache_hit = None
         
-        if use_search and self.web_search.should_use_search(kb_results, search_confidence_threshold):
+        if use_search and self.web_search.should_use_search(kb_results.distances, search_confidence_threshold):
             logger.info("Knowledge base confidence low, performing web search")
-            search_results = self.web_search.search(user_query)
+            search_cache_hit = self.web_search.is_cached(user_query)
+            search_results = await self.web_search.search(user_query)
             
             if search_results:
                 used_search = True
@@ -64,7 +82,7 @@ class RAGPipeline:
                 search_sources = [result.to_dict() for result in search_results]
         
         # Step 3: Generate response using LLM
-        answer = self.llm_client.generate_response(
+        answer = await self.llm_client.generate_response(
             query=user_query,
             knowledge_base_context=kb_results,
             search_results_context=search_context
@@ -78,10 +96,11 @@ class RAGPipeline:
             answer=answer,
             sources=sources,
             confidence=confidence,
-            used_web_search=used_search
+            used_web_search=used_search,
+            search_cache_hit=search_cache_hit
         )
         
-        logger.info(f"Query processed successfully. Confidence: {confidence:.2f}, Used search: {used_search}")
+        logger.info("Query processed successfully. Confidence: {:.2f}, Used search: {}", confidence, used_search)
         return response
     
     async def query_stream(
@@ -103,15 +122,15 @@ class RAGPipeline:
         Yields:
             Chunks of the generated response
         """
-        logger.info(f"Processing streaming query: '{user_query[:100]}...'")
+        logger.info("Processing streaming query: '{:.100}...'", user_query)
         
         # Retrieve from knowledge base
-        kb_results = self.vector_store.search(user_query, k=num_results)
+        kb_results = await asyncio.to_thread(self.vector_store.search, user_query, num_results)
         
         # Check if web search needed
         search_context = None
-        if use_search and self.web_search.should_use_search(kb_results, search_confidence_threshold):
-            search_results = self.web_search.search(user_query)
+        if use_search and self.web_search.should_use_search(kb_results.distances, search_confidence_threshold):
+            search_results = await self.web_search.search(user_query)
             if search_results:
                 search_context = self.web_search.format_search_results_for_context(search_results)
         
@@ -123,7 +142,7 @@ class RAGPipeline:
         ):
             yield chunk
     
-    def _calculate_confidence(self, kb_results: List[Dict]) -> float:
+    def _calculate_confidence(self, kb_results: SearchResults) -> float:
         """
         Calculate confidence score based on retrieval results.
         
@@ -137,7 +156,7 @@ class RAGPipeline:
             return 0.0
         
         # Use distance from top result (lower distance = higher confidence)
-        top_distance = kb_results[0].get('distance', 2.0)
+        top_distance = float(kb_results.distances[0])
         
         # Convert distance to confidence (distance of 0 = confidence 1.0, distance of 2 = confidence 0.0)
         confidence = max(0.0, min(1.0, 1.0 - (top_distance / 2.0)))
@@ -146,9 +165,9 @@ class RAGPipeline:
     
     def _format_sources(
         self,
-        kb_results: List[Dict],
+        kb_results: SearchResults,
         search_sources: List[Dict]
-    ) -> List[Dict]:
+    ) -> Tuple[RAGSource, ...]:
         """
         Format sources for the response.
         
@@ -157,31 +176,37 @@ class RAGPipeline:
             search_sources: Web search sources
             
         Returns:
-            List of formatted source dictionaries
+            Tuple of RAGSource objects
         """
         sources = []
         
-        # Add knowledge base sources
-        for result in kb_results[:3]:  # Top 3 KB sources
-            metadata = result.get('metadata', {})
-            sources.append({
-                'type': 'knowledge_base',
-                'filename': metadata.get('filename', 'Unknown'),
-                'page_number': metadata.get('page_number', 'N/A'),
-                'chunk_number': metadata.get('chunk_number', 'N/A'),
-                'relevance_score': round(1.0 - result.get('distance', 1.0) / 2.0, 2)
-            })
+        # Add knowledge base sources; results are already sorted by distance,
+        # so the top 3 are a slice and relevance scores are one vector op
+        top_k = min(3, len(kb_results))
+        relevance_scores = np.round(1.0 - kb_results.distances[:top_k] / 2.0, 2).tolist()
+        for metadata, relevance_score in zip(kb_results.metadatas[:top_k], relevance_scores):
+            sources.append(RAGSource(
+                type='knowledge_base',
+                filename=metadata.get('filename', 'Unknown'),
+                page_number=str(metadata.get('page_number', 'N/A')),
+                chunk_number=str(metadata.get('chunk_number', 'N/A')),
+                relevance_score=relevance_score
+            ))
         
         # Add web search sources
         for search_source in search_sources[:3]:  # Top 3 web sources
-            sources.append({
-                'type': 'web_search',
-                'title': search_source.get('title', 'No title'),
-                'url': search_source.get('url', ''),
-                'relevance_score': search_source.get('score', 0.0)
-            })
-        
-        return sources
+            sources.append(RAGSource(
+                type='web_search',
+                title=search_source.get('title', 'No title'),
+                url=search_source.get('url', ''),
+                relevance_score=float(search_source.get('score') or 0.0)
+            ))
+        
+        return tuple(sources)
+    
+    async def aclose(self) -> None:
+        """Release network clients held by the pipeline."""
+        await self.web_search.aclose()
     
     def get_pipeline_stats(self) -> Dict:
         """Get statistics about the RAG pipeline."""
@@ -1,22 +1,69 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
+from fastapi.responses import ORJSONResponse
+from app.config import get_settings
 from app.api.routes import chat, knowledge, health
+from app.core.rag_pipeline import RAGPipeline
+from app.services.pdf_processor import PDFProcessor
 from app.utils.logger import app_logger as logger
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the services shared by all routers on startup and close them on shutdown."""
+    settings = get_settings()
+    logger.info("Starting {} v{}", settings.api_title, settings.api_version)
+    logger.info("Environment: {}", settings.environment)
+    logger.info("LLM Model: {}", settings.openai_model)
+    logger.info("Embedding Model: {}", settings.embedding_model)
+    
+    # Size both worker pools: asyncio.to_thread uses the loop's default
+    # executor, sync (def) endpoints and background tasks use anyio's limiter.
+    # The limiter is only ever raised: indexing tasks hold a token for a whole
+    # parse and embed, so shrinking it below anyio's default starves requests
+    pool_size = settings.thread_pool_size or max(8, (os.cpu_count() or 1) * 4)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=pool_size))
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, pool_size)
+    logger.info("Thread pool size: {} (anyio limiter: {})", pool_size, limiter.total_tokens)
+    
+    # One pipeline (embedding model, Chroma client, LLM and search clients)
+    # shared by every router
+    app.state.pipeline = RAGPipeline()
+    # Uploads are indexed in background threads; splitting each large PDF
+    # over a fresh process pool there would multiply processes per upload
+    app.state.pdf_processor = PDFProcessor(parallel_pages=False)
+    
+    # Pay for model and index loading now rather than on the first query
+    await asyncio.to_thread(app.state.pipeline.vector_store.warmup)
+    logger.info("Embedding model and vector index warmed up")
+    
+    yield
+    
+    logger.info("Shutting down application")
+    await app.state.pipeline.aclose()
+
+
+settings = get_settings()
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
-    description="RAG-based chatbot API with PDF knowledge base and web search integration"
+    description="RAG-based chatbot API with PDF knowledge base and web search integration",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
-origins = settings.allowed_origins.split(",") if settings.allowed_origins != "*" else ["*"]
-
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,
+    allow_origins=settings.allowed_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -28,30 +75,15 @@ app.include_router(chat.router, prefix="/api/v1/chat", tags=["Chat"])
 app.include_router(knowledge.router, prefix="/api/v1/knowledge", tags=["Knowledge Base"])
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup."""
-    logger.info(f"Starting {settings.api_title} v{settings.api_version}")
-    logger.info(f"Environment: {settings.environment}")
-    logger.info(f"LLM Model: {settings.openai_model}")
-    logger.info(f"Embedding Model: {settings.embedding_model}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown."""
-    logger.info("Shutting down application")
-
-
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
-    return {
+    return ORJSONResponse(content={
         "message": "RAG Chatbot API",
         "version": settings.api_version,
         "docs": "/docs",
         "health": "/api/v1/health"
-    }
+    })
 
 
 if __name__ == "__main__":
@@ -1,22 +1,71 @@
-from typing import List, Dict, Optional
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple
+from dataclasses import dataclass, field
 import chromadb
+import numpy as np
 from chromadb.config import Settings as ChromaSettings
 from pathlib import Path
-from app.config import settings
+from app.config import get_settings
 from app.core.embeddings import EmbeddingService
-from app.services.pdf_processor import DocumentChunk
+from app.services.pdf_processor import ChunkBatch
 from app.utils.logger import app_logger as logger
 
+# Search results kept per exact (query, k)
+SEARCH_CACHE_SIZE = 1024
+
+# Seconds cached search results and the chunk count are reused between local
+# writes, bounding how long writes from another process go unnoticed
+CACHE_TTL = 5.0
+
+# Recent query embeddings checked for near-duplicate questions, and the
+# cosine similarity above which their results are reused
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# Indexed filenames saved alongside the database
+FILENAMES_FILE = "files.json"
+
+# Index settings for new collections. Cosine distance (0 = identical,
+# 2 = opposite) is what the confidence scores assume; the HNSW parameters
+# trade a slower build for better recall. Chroma fixes these when a
+# collection is created, so existing collections need a reindex to pick
+# them up.
+COLLECTION_METADATA = {
+    "description": "Product knowledge base for RAG chatbot",
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 128,
+    "hnsw:M": 32
+}
+
+
+@dataclass
+class SearchResults:
+    """Knowledge base search results in columnar form, ordered by ascending distance."""
+    ids: List[str] = field(default_factory=list)
+    contents: List[str] = field(default_factory=list)
+    metadatas: List[Dict] = field(default_factory=list)
+    distances: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+
 
 class VectorStore:
     """Service for managing vector database operations using ChromaDB."""
     
     def __init__(self):
+        settings = get_settings()
         self.embedding_service = EmbeddingService()
+        self.collection_name = settings.collection_name
+        self.index_batch_size = settings.index_batch_size
         self.db_path = Path(settings.vector_db_path)
         self.db_path.mkdir(parents=True, exist_ok=True)
         
-        logger.info(f"Initializing ChromaDB at: {self.db_path}")
+        logger.info("Initializing ChromaDB at: {}", self.db_path)
         
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
@@ -27,79 +76,291 @@ class VectorStore:
         )
         
         # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=settings.collection_name,
-            metadata={"description": "Product knowledge base for RAG chatbot"}
+        self.collection = self._open_collection()
+        
+        logger.info("Collection '{}' initialized with {} documents", self.collection_name, self.collection.count())
+        
+        # Search result caches, with entries stored as (expiry, ...); cleared
+        # whenever the collection changes and expired after CACHE_TTL
+        self._search_cache_lock = threading.Lock()
+        self._search_cache: "OrderedDict[Tuple[str, int], Tuple[float, SearchResults]]" = OrderedDict()
+        self._semantic_vectors = np.zeros(
+            (SEMANTIC_CACHE_SIZE, self.embedding_service.get_dimension()), dtype=np.float32
         )
+        self._semantic_entries: List[Optional[Tuple[float, int, SearchResults]]] = [None] * SEMANTIC_CACHE_SIZE
+        self._semantic_count = 0
+        self._semantic_next = 0
+        self._cache_generation = 0
+        self._count: Optional[int] = None
+        self._count_expires = 0.0
         
-        logger.info(f"Collection '{settings.collection_name}' initialized with {self.collection.count()} documents")
+        # Filenames in the collection, maintained as chunks are added and
+        # deleted and persisted next to the database; rebuilt when the chunk
+        # count no longer matches (e.g. another process wrote to the same database)
+        self._filenames_lock = threading.Lock()
+        self._filenames_path = self.db_path / FILENAMES_FILE
+        self._filenames: Optional[Set[str]] = None
+        self._filenames_count = 0
+        self._load_filenames()
+    
+    def _load_filenames(self) -> None:
+        """Restore the filename set saved by a previous run, if any."""
+        try:
+            saved = json.loads(self._filenames_path.read_text())
+            self._filenames = set(saved['filenames'])
+            self._filenames_count = saved['count']
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable {}: {}", self._filenames_path, e)
     
-    def add_documents(self, chunks: List[DocumentChunk]) -> None:
+    def _save_filenames(self) -> None:
+        """Persist the filename set; called with the filename lock held."""
+        try:
+            tmp_path = self._filenames_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({
+                'count': self._filenames_count,
+                'filenames': sorted(self._filenames)
+            }))
+            tmp_path.replace(self._filenames_path)
+        except OSError as e:
+            # Only an optimization; the set is rebuilt from the collection
+            logger.warning("Could not save {}: {}", self._filenames_path, e)
+    
+    def _unique_filenames(self, count: int) -> Set[str]:
+        """Filenames with chunks in the collection, rebuilt only when stale."""
+        with self._filenames_lock:
+            if self._filenames is None or self._filenames_count != count:
+                metadatas = self.collection.get(include=["metadatas"])['metadatas'] if count else []
+                self._filenames = {
+                    metadata['filename'] for metadata in metadatas or []
+                    if metadata and 'filename' in metadata
+                }
+                self._filenames_count = count
+                self._save_filenames()
+            return self._filenames
+    
+    def _update_filenames(
+        self,
+        count_before: int,
+        count_after: int,
+        added: Set[str] = frozenset(),
+        removed: Set[str] = frozenset()
+    ) -> None:
+        """Apply a known change to the filename set if it was up to date."""
+        with self._filenames_lock:
+            if self._filenames is None or self._filenames_count != count_before:
+                # Already stale; the next get_stats rebuilds it
+                return
+            self._filenames |= added
+            self._filenames -= removed
+            self._filenames_count = count_after
+            self._save_filenames()
+    
+    def _open_collection(self):
+        """
+        Open the existing collection, or create it with the index settings.
+        
+        get_or_create_collection would overwrite an existing collection's
+        metadata without rebuilding its index, so it isn't used here.
+        """
+        try:
+            collection = self.client.get_collection(name=self.collection_name)
+        except ValueError:
+            return self.client.create_collection(name=self.collection_name, metadata=COLLECTION_METADATA)
+        
+        if (collection.metadata or {}).get("hnsw:space") != COLLECTION_METADATA["hnsw:space"]:
+            logger.warning(
+                "Collection '{}' predates the cosine HNSW index settings; reindex to apply them",
+                self.collection_name
+            )
+        return collection
+    
+    def _invalidate_search_cache(self) -> None:
+        """Drop cached search results after the collection changes."""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+            self._semantic_entries = [None] * SEMANTIC_CACHE_SIZE
+            self._semantic_count = 0
+            self._semantic_next = 0
+            self._cache_generation += 1
+            self._count = None
+    
+    def _cached_count(self) -> int:
+        """Chunk count, reused until the collection changes or the TTL expires."""
+        with self._search_cache_lock:
+            if self._count is not None and time.monotonic() < self._count_expires:
+                return self._count
+            generation = self._cache_generation
+        
+        count = self.collection.count()
+        with self._search_cache_lock:
+            # Don't cache a count read while a write was invalidating it
+            if generation == self._cache_generation:
+                self._count = count
+                self._count_expires = time.monotonic() + CACHE_TTL
+        return count
+    
+    def _lookup_semantic(self, query_vector: np.ndarray, k: int) -> Optional[SearchResults]:
+        """Return cached results of a recent query similar enough to this one."""
+        with self._search_cache_lock:
+            if self._semantic_count == 0:
+                return None
+            
+            # One matrix-vector product against all recent (normalized) queries
+            similarities = self._semantic_vectors[:self._semantic_count] @ query_vector
+            now = time.monotonic()
+            for index in np.argsort(similarities)[::-1]:
+                if similarities[index] <= SEMANTIC_CACHE_THRESHOLD:
+                    return None
+                expires, cached_k, results = self._semantic_entries[index]
+                if cached_k == k and now < expires:
+                    return results
+        return None
+    
+    def _store_search(
+        self,
+        query: str,
+        k: int,
+        query_vector: np.ndarray,
+        results: SearchResults,
+        generation: int
+    ) -> None:
+        """Remember results for both the exact and the semantic cache."""
+        with self._search_cache_lock:
+            # The collection changed while this search ran; don't cache stale results
+            if generation != self._cache_generation:
+                return
+            
+            expires = time.monotonic() + CACHE_TTL
+            self._search_cache[(query, k)] = (expires, results)
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+            
+            # Ring buffer: overwrite the oldest embedding once full
+            self._semantic_vectors[self._semantic_next] = query_vector
+            self._semantic_entries[self._semantic_next] = (expires, k, results)
+            self._semantic_next = (self._semantic_next + 1) % SEMANTIC_CACHE_SIZE
+            self._semantic_count = min(self._semantic_count + 1, SEMANTIC_CACHE_SIZE)
+    
+    def add_documents(self, chunks: ChunkBatch) -> None:
         """
         Add document chunks to the vector store.
         
         Args:
-            chunks: List of DocumentChunk objects to index
+            chunks: ChunkBatch to index
         """
         if not chunks:
             logger.warning("No chunks provided to add_documents")
             return
         
-        logger.info(f"Adding {len(chunks)} document chunks to vector store")
-        
-        # Prepare data for ChromaDB
-        ids = [chunk.chunk_id for chunk in chunks]
-        documents = [chunk.content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
+        logger.info("Adding {} document chunks to vector store", len(chunks))
+        count_before = self.collection.count()
         
-        # Generate embeddings
-        embeddings = self.embedding_service.generate_embeddings_batch(documents)
+        # Embed and add one batch at a time so memory stays bounded for
+        # large ingests
+        try:
+            for i in range(0, len(chunks), self.index_batch_size):
+                stop = i + self.index_batch_size
+                
+                # Prepare data for ChromaDB; columns are sliced directly
+                ids = chunks.ids[i:stop]
+                documents = chunks.contents[i:stop]
+                metadatas = chunks.metadatas(i, stop)
+                
+                # Generate embeddings
+                embeddings = self.embedding_service.generate_embeddings_batch(documents)
+                
+                # Add to collection
+                self.collection.add(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas
+                )
+        finally:
+            # Earlier batches may have landed even if a later one failed
+            self._invalidate_search_cache()
         
-        # Add to collection
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
+        count_after = self.collection.count()
+        self._update_filenames(
+            count_before,
+            count_after,
+            added=chunks.filenames
         )
         
-        logger.info(f"Successfully added {len(chunks)} chunks. Total documents: {self.collection.count()}")
+        logger.info("Successfully added {} chunks. Total documents: {}", len(chunks), count_after)
     
-    def search(self, query: str, k: int = 5) -> List[Dict]:
+    def search(self, query: str, k: int = 5) -> SearchResults:
         """
         Search for relevant documents using semantic similarity.
         
+        Results are cached per exact query, and reused for a new query whose
+        embedding is nearly identical to a recent one.
+        
         Args:
             query: Search query text
             k: Number of results to return
             
         Returns:
-            List of dictionaries containing document content, metadata, and scores
+            SearchResults with document ids, contents, metadata and distances
         """
-        logger.info(f"Searching for: '{query[:100]}...' (top {k} results)")
+        logger.info("Searching for: '{:.100}...' (top {} results)", query, k)
+        
+        with self._search_cache_lock:
+            generation = self._cache_generation
+            entry = self._search_cache.get((query, k))
+            cached = None
+            if entry is not None:
+                if time.monotonic() < entry[0]:
+                    cached = entry[1]
+                    self._search_cache.move_to_end((query, k))
+                else:
+                    del self._search_cache[(query, k)]
+        if cached is not None:
+            logger.info("Search cache hit ({} results)", len(cached))
+            return cached
         
-        # Generate query embedding
-        query_embedding = self.embedding_service.generate_embedding(query)
+        n_results = min(k, self._cached_count())
+        if n_results == 0:
+            logger.info("Found 0 results")
+            return SearchResults()
         
-        # Search in collection
+        # Generate query embedding; Chroma accepts the ndarray as-is, which
+        # skips building a list of Python floats per query
+        query_embedding = self.embedding_service.generate_embedding(query, as_list=False)
+        
+        norm = np.linalg.norm(query_embedding)
+        query_vector = query_embedding / norm if norm > 0 else query_embedding
+        cached = self._lookup_semantic(query_vector, k)
+        if cached is not None:
+            logger.info("Semantic search cache hit ({} results)", len(cached))
+            return cached
+        
+        # Search in the collection handle opened at init
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(k, self.collection.count())
+            query_embeddings=query_embedding[np.newaxis, :],
+            n_results=n_results,
+            include=["metadatas", "documents", "distances"]
         )
         
-        # Format results
-        formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                formatted_results.append({
-                    'content': doc,
-                    'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                    'distance': results['distances'][0][i] if results['distances'] else 0.0,
-                    'id': results['ids'][0][i] if results['ids'] else None
-                })
+        # Chroma already returns columns; keep them instead of building a dict per hit
+        search_results = SearchResults(
+            ids=results['ids'][0],
+            contents=results['documents'][0] if results['documents'] else [],
+            metadatas=results['metadatas'][0] if results['metadatas'] else [],
+            distances=np.asarray(results['distances'][0] if results['distances'] else [], dtype=np.float64)
+        )
         
-        logger.info(f"Found {len(formatted_results)} results")
-        return formatted_results
+        logger.info("Found {} results", len(search_results))
+        self._store_search(query, k, query_vector, search_results, generation)
+        return search_results
+    
+    def warmup(self) -> None:
+        """Warm up the embedding model and load the index with one uncached query."""
+        embedding = self.embedding_service.warmup()
+        if self.collection.count() > 0:
+            self.collection.query(query_embeddings=embedding[np.newaxis, :], n_results=1, include=[])
     
     def delete_document(self, doc_id: str) -> None:
         """
@@ -110,9 +371,14 @@ class VectorStore:
         """
         try:
             self.collection.delete(ids=[doc_id])
-            logger.info(f"Deleted document: {doc_id}")
+            self._invalidate_search_cache()
+            
+            # The file may still have other chunks; recount on next use
+            with self._filenames_lock:
+                self._filenames = None
+            logger.info("Deleted document: {}", doc_id)
         except Exception as e:
-            logger.error(f"Error deleting document {doc_id}: {str(e)}")
+            logger.error("Error deleting document {}: {}", doc_id, e)
             raise
     
     def delete_by_filename(self, filename: str) -> None:
@@ -123,21 +389,29 @@ class VectorStore:
             filename: Name of the file whose chunks to delete
         """
         try:
-            # Query all documents from this file
+            # Query all documents from this file; only the ids are needed
+            count_before = self.collection.count()
             results = self.collection.get(
-                where={"filename": filename}
+                where={"filename": filename},
+                include=[]
             )
             
             if results['ids']:
                 self.collection.delete(ids=results['ids'])
-                logger.info(f"Deleted {len(results['ids'])} chunks from file: {filename}")
+                self._invalidate_search_cache()
+                self._update_filenames(count_before, count_before - len(results['ids']), removed={filename})
+                logger.info("Deleted {} chunks from file: {}", len(results['ids']), filename)
             else:
-                logger.info(f"No chunks found for file: {filename}")
+                logger.info("No chunks found for file: {}", filename)
                 
         except Exception as e:
-            logger.error(f"Error deleting chunks for {filename}: {str(e)}")
+            logger.error("Error deleting chunks for {}: {}", filename, e)
             raise
     
+    def count(self) -> int:
+        """Get the number of chunks in the collection."""
+        return self._cached_count()
+    
     def get_stats(self) -> Dict[str, any]:
         """
         Get statistics about the vector store.
@@ -147,22 +421,10 @@ class VectorStore:
         """
         count = self.collection.count()
         
-        # Get unique filenames
-        if count > 0:
-            all_docs = self.collection.get()
-            unique_files = set()
-            if all_docs['metadatas']:
-                for metadata in all_docs['metadatas']:
-                    if 'filename' in metadata:
-                        unique_files.add(metadata['filename'])
-            num_files = len(unique_files)
-        else:
-            num_files = 0
-        
         stats = {
             'total_chunks': count,
-            'unique_files': num_files,
-            'collection_name': settings.collection_name,
+            'unique_files': len(self._unique_filenames(count)),
+            'collection_name': self.collection_name,
             'embedding_model': self.embedding_service.get_model_name(),
             'embedding_dimension': self.embedding_service.get_dimension()
         }
@@ -172,9 +434,11 @@ class VectorStore:
     def clear_collection(self) -> None:
         """Clear all documents from the collection."""
         logger.warning("Clearing all documents from collection")
-        self.client.delete_collection(name=settings.collection_name)
-        self.collection = self.client.get_or_create_collection(
-            name=settings.collection_name,
-            metadata={"description": "Product knowledge base for RAG chatbot"}
-        )
+        self.client.delete_collection(name=self.collection_name)
+        self.collection = self.client.create_collection(name=self.collection_name, metadata=COLLECTION_METADATA)
+        self._invalidate_search_cache()
+        with self._filenames_lock:
+            self._filenames = set()
+            self._filenames_count = 0
+            self._save_filenames()
         logger.info("Collection cleared and recreated")
@@ -1,8 +1,13 @@
+from hashlib import blake2b
 from typing import List, Dict, Optional
-from tavily import TavilyClient
-from app.config import settings
+import httpx
+import numpy as np
+from cachetools import TTLCache
+from app.config import get_settings
 from app.utils.logger import app_logger as logger
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
 
 class SearchResult:
     """Represents a web search result."""
@@ -26,11 +31,51 @@ class WebSearchService:
     """Service for performing web searches using Tavily API."""
     
     def __init__(self):
-        self.client = TavilyClient(api_key=settings.tavily_api_key)
+        settings = get_settings()
+        self.api_key = settings.tavily_api_key
         self.max_results = settings.max_search_results
+        self.confidence_margin = settings.search_confidence_margin
+        
+        # One pooled HTTP/2 client reused for every search; keep-alive and
+        # multiplexing avoid a TCP/TLS handshake per request
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+        
+        # Recent results keyed by normalized query, so repeated chat questions
+        # skip the Tavily round-trip until the entry expires
+        self._cache: TTLCache = TTLCache(
+            maxsize=settings.search_cache_maxsize,
+            ttl=settings.search_cache_ttl
+        )
         logger.info("WebSearchService initialized with Tavily API")
     
-    def search(self, query: str, max_results: Optional[int] = None) -> List[SearchResult]:
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client."""
+        await self.client.aclose()
+    
+    @staticmethod
+    def _cache_key(query: str, max_results: int) -> bytes:
+        """Hash the lowercased, whitespace-collapsed query with the result limit."""
+        normalized = " ".join(query.lower().split())
+        return blake2b(f"{max_results}:{normalized}".encode(), digest_size=16).digest()
+    
+    def is_cached(self, query: str, max_results: Optional[int] = None) -> bool:
+        """
+        Check whether results for a query are currently cached.
+        
+        Args:
+            query: Search query
+            max_results: Maximum number of results (defaults to settings.max_search_results)
+            
+        Returns:
+            True if search() would be answered from the cache
+        """
+        return self._cache_key(query, max_results or self.max_results) in self._cache
+    
+    async def search(self, query: str, max_results: Optional[int] = None) -> List[SearchResult]:
         """
         Perform a web search for the given query.
         
@@ -42,18 +87,30 @@ class WebSearchService:
             List of SearchResult objects
         """
         max_results = max_results or self.max_results
+        cache_key = self._cache_key(query, max_results)
+        
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info("Web search cache hit: '{:.100}...'", query)
+            return list(cached)
         
         try:
-            logger.info(f"Performing web search: '{query[:100]}...'")
+            logger.info("Performing web search: '{:.100}...'", query)
             
             # Perform search using Tavily
-            response = self.client.search(
-                query=query,
-                max_results=max_results,
-                search_depth="basic",
-                include_answer=True,
-                include_raw_content=False
+            http_response = await self.client.post(
+                TAVILY_SEARCH_URL,
+                json={
+                    'api_key': self.api_key,
+                    'query': query,
+                    'max_results': max_results,
+                    'search_depth': "basic",
+                    'include_answer': True,
+                    'include_raw_content': False
+                }
             )
+            http_response.raise_for_status()
+            response = http_response.json()
             
             # Process results
             search_results = []
@@ -68,37 +125,51 @@ class WebSearchService:
                     )
                     search_results.append(search_result)
             
-            logger.info(f"Found {len(search_results)} search results")
-            return search_results
+            logger.info("Found {} search results", len(search_results))
+            # Failed searches return early below and are never cached
+            self._cache[cache_key] = search_results
+            return list(search_results)
             
         except Exception as e:
-            logger.error(f"Error performing web search: {str(e)}")
+            logger.error("Error performing web search: {}", e)
             return []
     
-    def should_use_search(self, knowledge_base_results: List[Dict], confidence_threshold: float = 0.7) -> bool:
+    def should_use_search(
+        self,
+        distances: np.ndarray,
+        confidence_threshold: float = 0.7,
+        margin: Optional[float] = None
+    ) -> bool:
         """
         Determine if web search should be used based on knowledge base results.
         
         Args:
-            knowledge_base_results: Results from vector store search
+            distances: Distances of the knowledge base results, best first
             confidence_threshold: Minimum confidence to skip search
+            margin: Also search when the top two results are closer in
+                confidence than this (defaults to settings.search_confidence_margin;
+                0 disables the check)
             
         Returns:
             True if web search should be performed
         """
-        if not knowledge_base_results:
+        if len(distances) == 0:
             logger.info("No knowledge base results, will use web search")
             return True
         
-        # Check if top result has high confidence (low distance)
-        top_result_distance = knowledge_base_results[0].get('distance', 1.0)
+        margin = self.confidence_margin if margin is None else margin
         
         # ChromaDB uses distance (lower is better), convert to confidence
         # Distance of 0 = perfect match, distance of 2 = completely different
-        confidence = 1.0 - (top_result_distance / 2.0)
+        confidences = 1.0 - np.asarray(distances[:2], dtype=np.float64) / 2.0
+        confidence = float(confidences[0])
         
         use_search = confidence < confidence_threshold
-        logger.info(f"Top result confidence: {confidence:.2f}, threshold: {confidence_threshold}, use_search: {use_search}")
+        if not use_search and margin > 0 and len(confidences) > 1:
+            # An ambiguous top result is treated like a weak one
+            use_search = confidence - float(confidences[1]) < margin
+        
+        logger.info("Top result confidence: {:.2f}, threshold: {}, use_search: {}", confidence, confidence_threshold, use_search)
         
         return use_search
     
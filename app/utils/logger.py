@@ -1,6 +1,6 @@
 import sys
 from loguru import logger
-from app.config import settings
+from app.config import get_settings
 
 
 def setup_logger():
@@ -13,7 +13,7 @@ def setup_logger():
     logger.add(
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level=settings.log_level,
+        level=get_settings().log_level,
         colorize=True
     )
     
@@ -30,17 +30,37 @@ def main():
     initial_stats = store.get_stats()
     logger.info(f"Current state: {initial_stats['total_chunks']} chunks from {initial_stats['unique_files']} files")
     
-    # Process PDFs
-    logger.info("Processing PDF documents...")
-    chunks = processor.process_directory()
+    # Process PDFs, skipping files unchanged since the last run (unless the
+    # vector store is empty, e.g. after deleting the database). Each file is
+    # indexed as soon as it is parsed, while the remaining files keep parsing
+    # in the background.
+    logger.info("Processing and indexing PDF documents...")
+    manifest = processor.load_manifest() if initial_stats['total_chunks'] > 0 else {}
+    indexed_files = 0
+    indexed_chunks = 0
     
-    if not chunks:
-        logger.warning("No PDF files found or processed. Please add PDF files to data/pdfs/")
+    for filename, chunks in processor.iter_directory(manifest=manifest):
+        # Drop chunks from an earlier version of the file, even if the new
+        # version has no text left to index
+        store.delete_by_filename(filename)
+        if not chunks:
+            continue
+        
+        store.add_documents(chunks)
+        indexed_files += 1
+        indexed_chunks += len(chunks)
+        logger.info(f"Indexed {len(chunks)} chunks from {filename}")
+    
+    processor.save_manifest(manifest)
+    
+    if not indexed_chunks:
+        if manifest:
+            logger.info("All PDF files are already indexed and unchanged")
+        else:
+            logger.warning("No PDF files found or processed. Please add PDF files to data/pdfs/")
         return
     
-    # Index documents
-    logger.info(f"Indexing {len(chunks)} chunks...")
-    store.add_documents(chunks)
+    logger.info(f"Indexed {indexed_chunks} chunks from {indexed_files} files")
     
     # Get final stats
     final_stats = store.get_stats()
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import numpy as np
+import pytest
+
+# Settings are read when the app modules are imported; the stubbed services
+# never call the APIs, so placeholder keys are enough
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+from app.config import get_settings
+from app.core.embeddings import EmbeddingService
+
+
+STUB_DIMENSION = 8
+
+
+class StubEncoder:
+    """Deterministic stand-in for the sentence transformer, recording what it encodes."""
+    
+    def __init__(self):
+        self.encoded = []
+    
+    @staticmethod
+    def vector(text: str) -> np.ndarray:
+        """Unit vector derived from a hash of the text."""
+        digest = hashlib.sha256(text.encode('utf-8')).digest()[:STUB_DIMENSION]
+        vector = np.frombuffer(digest, dtype=np.uint8).astype(np.float32) + 1
+        return vector / np.linalg.norm(vector)
+    
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, convert_to_tensor=False):
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        self.encoded.extend(texts)
+        vectors = np.stack([self.vector(text) for text in texts])
+        return vectors[0] if isinstance(sentences, str) else vectors
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return STUB_DIMENSION
+
+
+@pytest.fixture
+def test_settings(tmp_path, monkeypatch):
+    """Settings pointing every on-disk store at a temporary directory."""
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "vector_db"))
+    monkeypatch.setenv("PDF_DIRECTORY", str(tmp_path / "pdfs"))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "cache" / "embeddings.sqlite3"))
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def stub_encoder(test_settings, monkeypatch):
+    """Fresh EmbeddingService singleton backed by a StubEncoder instead of the HF model."""
+    encoder = StubEncoder()
+    monkeypatch.setattr(EmbeddingService, "_instance", None)
+    monkeypatch.setattr(EmbeddingService, "_model", None)
+    monkeypatch.setattr(EmbeddingService, "_load_model", lambda self, backend, onnx_path: encoder)
+    return encoder
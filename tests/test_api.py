@@ -1,11 +1,19 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.api.dependencies import get_app_settings
+from app.api.routes import knowledge
+from app.config import get_settings
 
-client = TestClient(app)
 
+@pytest.fixture(scope="module")
+def client():
+    """Test client with the application lifespan (shared services) running."""
+    with TestClient(app) as test_client:
+        yield test_client
 
-def test_root_endpoint():
+
+def test_root_endpoint(client):
     """Test root endpoint returns API information."""
     response = client.get("/")
     assert response.status_code == 200
@@ -14,7 +22,7 @@ def test_root_endpoint():
     assert "version" in data
 
 
-def test_health_check():
+def test_health_check(client):
     """Test basic health check endpoint."""
     response = client.get("/api/v1/health")
     assert response.status_code == 200
@@ -23,7 +31,7 @@ def test_health_check():
     assert "timestamp" in data
 
 
-def test_detailed_health_check():
+def test_detailed_health_check(client):
     """Test detailed health check endpoint."""
     response = client.get("/api/v1/health/detailed")
     assert response.status_code == 200
@@ -35,7 +43,7 @@ def test_detailed_health_check():
     assert "documents_indexed" in data
 
 
-def test_list_documents():
+def test_list_documents(client):
     """Test document listing endpoint."""
     response = client.get("/api/v1/knowledge/documents")
     assert response.status_code == 200
@@ -43,3 +51,42 @@ def test_list_documents():
     assert "documents" in data
     assert "total_count" in data
     assert isinstance(data["documents"], list)
+
+
+def test_upload_pdf_queues_indexing(client, tmp_path, monkeypatch):
+    """Test PDF upload saves the file and queues background indexing."""
+    indexed = []
+    test_settings = get_settings().model_copy(update={"pdf_directory": str(tmp_path)})
+    monkeypatch.setitem(app.dependency_overrides, get_app_settings, lambda: test_settings)
+    monkeypatch.setattr(knowledge, "index_pdf", lambda file_path, job_id, *services: indexed.append((file_path, job_id)))
+    
+    content = b"%PDF-1.4\n%%EOF\n"
+    response = client.post(
+        "/api/v1/knowledge/upload",
+        files={"file": ("guide.pdf", content, "application/pdf")}
+    )
+    assert response.status_code == 202
+    data = response.json()
+    assert data["filename"] == "guide.pdf"
+    assert data["chunks_created"] == 0
+    assert data["job_id"]
+    assert (tmp_path / "guide.pdf").read_bytes() == content
+    assert indexed == [(str(tmp_path / "guide.pdf"), data["job_id"])]
+    
+    job_response = client.get(f"/api/v1/knowledge/jobs/{data['job_id']}")
+    assert job_response.status_code == 200
+    assert job_response.json()["status"] == "queued"
+
+
+def test_list_documents_sees_new_files(client, tmp_path, monkeypatch):
+    """Test cached document listing is refreshed when the directory changes."""
+    test_settings = get_settings().model_copy(update={"pdf_directory": str(tmp_path)})
+    monkeypatch.setitem(app.dependency_overrides, get_app_settings, lambda: test_settings)
+    
+    assert client.get("/api/v1/knowledge/documents").json()["documents"] == []
+    
+    (tmp_path / "manual.pdf").write_bytes(b"%PDF-1.4\n%%EOF\n")
+    (tmp_path / "notes.txt").write_text("not a pdf")
+    data = client.get("/api/v1/knowledge/documents").json()
+    assert data["documents"] == ["manual.pdf"]
+    assert data["total_count"] == 1
@@ -0,0 +1,64 @@
+import sqlite3
+import numpy as np
+from app.core.embedding_cache import EmbeddingCache
+from app.core.embeddings import EmbeddingService
+from tests.conftest import StubEncoder
+
+
+def test_cache_round_trip_as_float16(tmp_path):
+    """Test vectors come back as float32 after being stored as float16."""
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model:torch")
+    hashes = [EmbeddingCache.hash_text("a"), EmbeddingCache.hash_text("b")]
+    vectors = np.array([[0.1, 0.2, 0.3], [1.0, -1.0, 0.5]], dtype=np.float32)
+    
+    stored = cache.put_many(hashes, vectors)
+    found = cache.get_many(hashes + [EmbeddingCache.hash_text("missing")])
+    
+    assert set(found) == set(hashes)
+    for digest, vector in zip(hashes, stored):
+        assert found[digest].dtype == np.float32
+        np.testing.assert_array_equal(found[digest], vector)
+    np.testing.assert_allclose(stored, vectors, atol=1e-3)
+
+
+def test_cache_reads_legacy_float32_rows(tmp_path):
+    """Test rows written as float32 before the float16 format are still read."""
+    db_path = tmp_path / "cache.sqlite3"
+    cache = EmbeddingCache(str(db_path), "model:torch")
+    digest = EmbeddingCache.hash_text("legacy")
+    vector = np.array([0.123456, -0.654321, 0.5], dtype=np.float32)
+    
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+            (digest, "model:torch", 3, vector.tobytes())
+        )
+    
+    np.testing.assert_array_equal(cache.get_many([digest])[digest], vector)
+
+
+def test_cache_is_keyed_by_model(tmp_path):
+    """Test vectors cached for one model are never returned for another."""
+    db_path = str(tmp_path / "cache.sqlite3")
+    digest = EmbeddingCache.hash_text("text")
+    EmbeddingCache(db_path, "model:torch").put_many([digest], np.ones((1, 3), dtype=np.float32))
+    
+    assert EmbeddingCache(db_path, "model:onnx-int8").get_many([digest]) == {}
+
+
+def test_batch_embeddings_keep_order_and_encode_each_text_once(stub_encoder):
+    """Test batch embedding dedupes misses, reuses cached vectors and keeps input order."""
+    service = EmbeddingService()
+    
+    texts = ["alpha", "beta", "alpha", "gamma"]
+    embeddings = service.generate_embeddings_batch(texts)
+    assert stub_encoder.encoded == ["alpha", "beta", "gamma"]
+    assert embeddings[0] == embeddings[2]
+    for text, embedding in zip(texts, embeddings):
+        np.testing.assert_allclose(embedding, StubEncoder.vector(text), atol=1e-3)
+    
+    stub_encoder.encoded.clear()
+    again = service.generate_embeddings_batch(["gamma", "delta", "alpha"])
+    assert stub_encoder.encoded == ["delta"]
+    assert again[0] == embeddings[3]
+    assert again[2] == embeddings[0]
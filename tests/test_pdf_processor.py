@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pytest
+from app.services import pdf_processor
+from app.services.pdf_processor import ChunkBatch, PDFProcessor
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    """Processor whose process_pdf returns one chunk per file, run in-process."""
+    processed = []
+    
+    def fake_process_pdf(self, file_path):
+        processed.append(os.path.basename(file_path))
+        if file_path.endswith("broken.pdf"):
+            raise ValueError("invalid pdf")
+        filename = os.path.basename(file_path)
+        return ChunkBatch(
+            ids=[f"{filename}_0"],
+            contents=["text"],
+            documents=[{'filename': filename}],
+            document_index=np.zeros(1, dtype=np.int64),
+            chunk_numbers=np.zeros(1, dtype=np.int64),
+            start_chars=np.zeros(1, dtype=np.int64),
+            end_chars=np.full(1, 4, dtype=np.int64)
+        )
+    
+    monkeypatch.setattr(pdf_processor, "_pool_size", lambda num_tasks: 1)
+    monkeypatch.setattr(PDFProcessor, "process_pdf", fake_process_pdf)
+    processor = PDFProcessor(chunk_size=100, chunk_overlap=10)
+    processor.processed = processed
+    return processor
+
+
+def test_manifest_skips_unchanged_files(processor, tmp_path):
+    """Test only new or modified files are processed once a manifest exists."""
+    (tmp_path / "a.pdf").write_bytes(b"one")
+    (tmp_path / "b.pdf").write_bytes(b"two")
+    
+    manifest = processor.load_manifest(str(tmp_path))
+    assert manifest == {}
+    chunks = processor.process_directory(str(tmp_path), manifest=manifest)
+    assert sorted(chunks.filenames) == ["a.pdf", "b.pdf"]
+    assert sorted(manifest) == ["a.pdf", "b.pdf"]
+    assert manifest["a.pdf"][2] == 1
+    processor.save_manifest(manifest, str(tmp_path))
+    
+    processor.processed.clear()
+    manifest = processor.load_manifest(str(tmp_path))
+    chunks = processor.process_directory(str(tmp_path), manifest=manifest)
+    assert len(chunks) == 0
+    assert processor.processed == []
+    
+    (tmp_path / "b.pdf").write_bytes(b"two, edited")
+    chunks = processor.process_directory(str(tmp_path), manifest=manifest)
+    assert processor.processed == ["b.pdf"]
+    assert chunks.filenames == {"b.pdf"}
+    assert manifest["b.pdf"][1] == len(b"two, edited")
+
+
+def test_manifest_drops_removed_and_failed_files(processor, tmp_path):
+    """Test removed files leave the manifest and failed files are retried next run."""
+    (tmp_path / "a.pdf").write_bytes(b"one")
+    (tmp_path / "b.pdf").write_bytes(b"two")
+    manifest = {}
+    processor.process_directory(str(tmp_path), manifest=manifest)
+    
+    (tmp_path / "a.pdf").unlink()
+    (tmp_path / "broken.pdf").write_bytes(b"bad")
+    processor.process_directory(str(tmp_path), manifest=manifest)
+    assert sorted(manifest) == ["b.pdf"]
+    
+    processor.processed.clear()
+    processor.process_directory(str(tmp_path), manifest=manifest)
+    assert processor.processed == ["broken.pdf"]
+
+
+def test_chunk_text_offsets_cover_text():
+    """Test chunks overlap, prefer sentence breaks and match their offsets."""
+    text = "First sentence here. " * 20
+    chunks = PDFProcessor(chunk_size=100, chunk_overlap=20).chunk_text(text, {'filename': 'doc.pdf'})
+    
+    assert chunks.start_chars[0] == 0
+    assert chunks.end_chars[-1] >= len(text)
+    for start, end, content in zip(chunks.start_chars, chunks.end_chars, chunks.contents):
+        assert content == text[start:end].strip()
+    assert all(text[end - 1] == "." for end in chunks.end_chars[:-1])
+    assert all(chunks.start_chars[1:] == chunks.end_chars[:-1] - 20)
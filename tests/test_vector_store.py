@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from app.services import vector_store as vector_store_module
+from app.services.pdf_processor import ChunkBatch
+from app.services.vector_store import VectorStore
+
+
+def make_chunks(filename: str, texts):
+    """ChunkBatch with one chunk per text, all from one file."""
+    count = len(texts)
+    return ChunkBatch(
+        ids=[f"{filename}_{i}" for i in range(count)],
+        contents=list(texts),
+        documents=[{'filename': filename}],
+        document_index=np.zeros(count, dtype=np.int64),
+        chunk_numbers=np.arange(count, dtype=np.int64),
+        start_chars=np.zeros(count, dtype=np.int64),
+        end_chars=np.zeros(count, dtype=np.int64)
+    )
+
+
+@pytest.fixture
+def store(stub_encoder):
+    """Vector store in a temporary database, embedding with the stub encoder."""
+    return VectorStore()
+
+
+def test_search_results_are_cached(store, stub_encoder):
+    """Test a repeated search is served from the cache without embedding again."""
+    store.add_documents(make_chunks("a.pdf", ["apples", "pears"]))
+    
+    results = store.search("apples", k=2)
+    assert len(results) == 2
+    assert results.contents[0] == "apples"
+    
+    stub_encoder.encoded.clear()
+    assert store.search("apples", k=2) is results
+    assert stub_encoder.encoded == []
+
+
+def test_writes_invalidate_search_cache(store):
+    """Test adding and deleting chunks drops cached results."""
+    store.add_documents(make_chunks("a.pdf", ["apples"]))
+    results = store.search("apples", k=5)
+    assert len(results) == 1
+    
+    store.add_documents(make_chunks("b.pdf", ["pears"]))
+    results = store.search("apples", k=5)
+    assert len(results) == 2
+    
+    store.delete_by_filename("b.pdf")
+    assert len(store.search("apples", k=5)) == 1
+    assert store.get_stats()['unique_files'] == 1
+
+
+def test_search_cache_expires(store, monkeypatch):
+    """Test writes from another process become visible once cached results expire."""
+    store.add_documents(make_chunks("a.pdf", ["apples"]))
+    results = store.search("apples", k=5)
+    
+    # Written behind this store's back, as another process would
+    store.collection.add(ids=["other"], documents=["pears"], embeddings=[[0.5] * 8], metadatas=[{'filename': 'c.pdf'}])
+    assert store.search("apples", k=5) is results
+    
+    now = vector_store_module.time.monotonic()
+    monkeypatch.setattr(vector_store_module.time, "monotonic", lambda: now + vector_store_module.CACHE_TTL + 1)
+    assert len(store.search("apples", k=5)) == 2
+
+
+def test_failed_add_still_invalidates_search_cache(store, monkeypatch):
+    """Test a partly indexed batch doesn't leave stale results cached."""
+    store.add_documents(make_chunks("a.pdf", ["apples"]))
+    results = store.search("apples", k=5)
+    
+    generate = store.embedding_service.generate_embeddings_batch
+    calls = []
+    
+    def fail_second_batch(texts):
+        calls.append(texts)
+        if len(calls) == 2:
+            raise RuntimeError("embedding failed")
+        return generate(texts)
+    
+    monkeypatch.setattr(store.embedding_service, "generate_embeddings_batch", fail_second_batch)
+    store.index_batch_size = 1
+    with pytest.raises(RuntimeError):
+        store.add_documents(make_chunks("b.pdf", ["pears", "plums"]))
+    
+    assert store.search("apples", k=5) is not results
+    assert len(store.search("apples", k=5)) == 2
+
+
+def test_filenames_persist_across_instances(store, stub_encoder):
+    """Test the indexed filename set is reloaded instead of rebuilt from the collection."""
+    store.add_documents(make_chunks("a.pdf", ["apples"]))
+    store.add_documents(make_chunks("b.pdf", ["pears"]))
+    assert store.get_stats()['unique_files'] == 2
+    
+    reopened = VectorStore()
+    assert reopened._filenames == {"a.pdf", "b.pdf"}
+    assert reopened.get_stats()['unique_files'] == 2